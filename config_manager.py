@@ -2,49 +2,211 @@
 Configuration handling for the eSim Tool Manager
 """
 
+import atexit
+import contextlib
 import json
+import mmap
+import os
+import re
+import shlex
+import tempfile
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Union
 
-from constants import CONFIG_FILE, USER_CONFIG_FILE, DEFAULT_PATHS, SYSTEM
+from constants import CONFIG_FILE, USER_CONFIG_FILE, DEFAULT_PATHS, SYSTEM, BULK_UPDATE_CHECKS
+from dependency_checker import get_linux_distro
 from logger import logger
+from utils import command_program
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the standard library parser
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    # ijson is optional; without it single-tool lookups parse the whole file
+    ijson = None
+
+def _json_loads(data: bytes) -> Any:
+    """Decode JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Characters that only a shell can interpret; commands containing them keep using one
+SHELL_METACHARACTERS = re.compile(r"[|&;<>()$`\\*?\[\]{}~#\n]")
+
+# Files at least this large are memory-mapped instead of read into a bytes copy
+MMAP_THRESHOLD = 64 * 1024
+
+def _json_load_file(f) -> Any:
+    """Decode JSON from a binary file, memory-mapping large files for orjson."""
+    if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # The view must be released before the map can be closed
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    return _json_loads(f.read())
+
+def _json_dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Encode JSON as UTF-8, compact unless pretty, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else None)
+    if pretty:
+        return json.dumps(obj, indent=2).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def _file_mode(path: str) -> int:
+    """Permission bits of an existing file, or those a newly created file would get."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
 
 class ConfigManager:
     """Manages loading and saving of tool and user configurations."""
 
     def __init__(self):
-        self.tools_config = self.load_config(CONFIG_FILE)
+        # The full tool catalog is only parsed when a command needs every tool
+        self._tools_config = None
+        self._tools_config_mtime = None
+        self._tool_configs = {}
+        # Resolved platform configs keyed by id() of their tool config
+        self._platform_cache = {}
+        # The platform never changes while we run, so fix the lookup keys up front:
+        # the OS section first, then an optional distro-specific subsection.
+        if SYSTEM == "linux":
+            self._platform_key_chain = (SYSTEM, get_linux_distro())
+        else:
+            self._platform_key_chain = (SYSTEM,)
         self.user_config = self.load_config(USER_CONFIG_FILE)
         self.install_path = self.get_install_path()
+        # Executable paths inside the install directory, keyed by (tool, executable)
+        self._exec_paths = {}
+        # Configured commands split into argument lists, keyed by command string
+        self._command_args = {}
+        # Pending user config changes are written once, at the end of an operation
+        self._dirty = False
+        # Depth of nested deferred_save() blocks; saves wait for the outermost one
+        self._save_deferred = 0
+        atexit.register(self.save_user_config)
         
+    @property
+    def tools_config(self) -> Dict[str, Any]:
+        """The full tool catalog, loaded on first access and reloaded if the file changes."""
+        mtime = self._config_mtime()
+        if self._tools_config is None or mtime != self._tools_config_mtime:
+            if self._tools_config is not None:
+                # Everything derived from the old catalog is stale
+                self._tool_configs.clear()
+                self._platform_cache.clear()
+            self._tools_config = self.load_config(CONFIG_FILE)
+            self._tools_config_mtime = mtime
+        return self._tools_config
+
+    def _config_mtime(self):
+        """Modification time of the tool catalog, or None if it can't be read."""
+        try:
+            return os.stat(CONFIG_FILE).st_mtime_ns
+        except OSError:
+            return None
+
     def load_config(self, config_file: str) -> Dict[str, Any]:
         """Load configuration from a JSON file."""
         config_path = Path(config_file)
         if not config_path.exists():
-            logger.warning(f"Configuration file {config_file} not found")
+            logger.warning("Configuration file %s not found", config_file)
             return {}
             
         try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
+            with open(config_path, 'rb') as f:
+                return _json_load_file(f)
         except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in configuration file {config_file}: {e}")
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            logger.error("Invalid JSON in configuration file %s: %s", config_file, e)
             return {}
         except Exception as e:
-            logger.error(f"Error reading configuration file {config_file}: {e}")
+            logger.error("Error reading configuration file %s: %s", config_file, e)
             return {}
     
+    def mark_dirty(self):
+        """Flag the user configuration as modified so the next save writes it."""
+        self._dirty = True
+
+    def load_tool_config(self, tool_name: str) -> Dict[str, Any]:
+        """
+        Load a single tool's configuration, stream-parsing the catalog if possible.
+        """
+        if ijson is None:
+            return self.tools_config.get("tools", {}).get(tool_name, {})
+        
+        config_path = Path(CONFIG_FILE)
+        if not config_path.exists():
+            logger.warning("Configuration file %s not found", CONFIG_FILE)
+            return {}
+        
+        try:
+            with open(config_path, 'rb') as f:
+                # Stop at the first match instead of materializing the whole catalog.
+                # Keys are compared exactly; a dotted name in an ijson prefix would
+                # select a nested section instead.
+                for name, tool_config in ijson.kvitems(f, "tools"):
+                    if name == tool_name:
+                        return tool_config
+                return {}
+        except ijson.JSONError as e:
+            logger.error("Invalid JSON in configuration file %s: %s", CONFIG_FILE, e)
+            return {}
+        except Exception as e:
+            logger.error("Error reading configuration file %s: %s", CONFIG_FILE, e)
+            return {}
+
+    @contextlib.contextmanager
+    def deferred_save(self):
+        """Hold back user configuration saves inside the block and save once at the end."""
+        self._save_deferred += 1
+        try:
+            yield
+        finally:
+            self._save_deferred -= 1
+            self.save_user_config()
+
     def save_user_config(self):
-        """Save user configuration to file."""
+        """Save user configuration to file if it has unsaved changes."""
+        if not self._dirty or self._save_deferred:
+            return True
+        
+        # Replace the file a symlinked config points to, not the link itself
+        config_path = os.path.realpath(USER_CONFIG_FILE)
+        temp_name = None
         try:
-            with open(USER_CONFIG_FILE, 'w') as f:
-                json.dump(self.user_config, f, indent=4)
+            # Write to a temporary file and swap it in so a crash never leaves a torn file
+            with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(config_path), suffix=".tmp",
+                                             delete=False) as f:
+                temp_name = f.name
+                f.write(_json_dumps(self.user_config))
+            # Temporary files are private; give it the permissions the config would have
+            os.chmod(temp_name, _file_mode(config_path))
+            os.replace(temp_name, config_path)
+            self._dirty = False
             logger.info("User configuration saved")
             return True
         except Exception as e:
-            logger.error(f"Error saving user configuration: {e}")
+            logger.error("Error saving user configuration: %s", e)
+            if temp_name is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(temp_name)
             return False
     
+    def dump_pretty(self) -> str:
+        """Render the user configuration as indented JSON for display."""
+        return _json_dumps(self.user_config, pretty=True).decode("utf-8")
+    
     def get_install_path(self) -> Path:
         """Get the installation path for tools."""
         # Check user config first
@@ -59,31 +221,84 @@ class ConfigManager:
         path_obj = Path(path)
         self.user_config["install_path"] = str(path_obj)
         self.install_path = path_obj
+        self._exec_paths.clear()
+        self.mark_dirty()
         self.save_user_config()
-        logger.info(f"Installation path set to {path}")
+        logger.info("Installation path set to %s", path)
     
+    def tool_exec_path(self, tool_name: str, exec_name: str) -> str:
+        """Get the path of a tool's executable inside the installation directory."""
+        key = (tool_name, exec_name)
+        exec_path = self._exec_paths.get(key)
+        if exec_path is None:
+            exec_path = os.path.join(self.install_path, tool_name, "bin", exec_name)
+            self._exec_paths[key] = exec_path
+        return exec_path
+
     def get_tool_config(self, tool_name: str) -> Dict[str, Any]:
         """Get configuration for a specific tool."""
-        return self.tools_config.get("tools", {}).get(tool_name, {})
+        if self._tools_config is not None:
+            return self._tools_config.get("tools", {}).get(tool_name, {})
+        
+        if tool_name not in self._tool_configs:
+            self._tool_configs[tool_name] = self.load_tool_config(tool_name)
+        return self._tool_configs[tool_name]
     
     def get_all_tools(self) -> Dict[str, Any]:
         """Get configuration for all tools."""
         return self.tools_config.get("tools", {})
     
+    def get_command_args(self, command: str, use_shell: bool = False) -> Union[str, List[str]]:
+        """
+        Split a configured command into an argument list so it runs without a shell.
+        Commands using shell features, commands marked with use_shell, and all
+        commands on Windows are returned unchanged and still run through the shell.
+        """
+        if use_shell or SYSTEM == "windows":
+            return command
+        
+        args = self._command_args.get(command)
+        if args is None:
+            try:
+                args = shlex.split(command)
+            except ValueError:
+                # Unbalanced quotes; let the shell report it
+                args = []
+            # A leading VAR=value assignment also needs the shell
+            if SHELL_METACHARACTERS.search(command) or not args or "=" in args[0]:
+                args = command
+            self._command_args[command] = args
+        return args
+
+    def get_bulk_update_check(self, update_check_cmd: str) -> str:
+        """
+        Get a command that checks every package of the package manager an
+        update_check command uses, or an empty string if there is none.
+        """
+        if not update_check_cmd:
+            return ""
+        return BULK_UPDATE_CHECKS.get(command_program(update_check_cmd), "")
+
     def get_platform_config(self, tool_config: Dict[str, Any]) -> Dict[str, Any]:
         """
         Get platform-specific configuration for a tool
         """
-        from constants import SYSTEM
-        from dependency_checker import get_linux_distro
-        
-        if SYSTEM in tool_config:
-            # This handles 'windows' and 'darwin' directly
-            return tool_config.get(SYSTEM, {})
-        elif SYSTEM == "linux":
-            distro = get_linux_distro()
-            linux_config = tool_config.get("linux", {})
-            # Return distro-specific config, or the general linux config if available
-            return linux_config.get(distro, linux_config)
+        cached = self._platform_cache.get(id(tool_config))
+        if cached is not None:
+            return cached[1]
         
-        return {}
\ No newline at end of file
+        platform_config = self._resolve_platform_config(tool_config)
+        # Keep a reference to the tool config so its id() can't be reused
+        self._platform_cache[id(tool_config)] = (tool_config, platform_config)
+        return platform_config
+
+    def _resolve_platform_config(self, tool_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Pick the section of a tool config that applies to this platform
+        """
+        system_key, *refinements = self._platform_key_chain
+        platform_config = tool_config.get(system_key, {})
+        # Use the distro-specific config, or keep the general linux config if there is none
+        for key in refinements:
+            platform_config = platform_config.get(key, platform_config)
+        return platform_config
\ No newline at end of file
@@ -28,6 +28,26 @@ PACKAGE_MANAGERS = {
     "darwin": "brew"
 }
 
+# Commands listing every upgradable package at once, keyed by the program
+# a tool's update_check runs
+BULK_UPDATE_CHECKS = {
+    "apt": "apt list --upgradable",
+    "apt-get": "apt list --upgradable",
+    "dnf": "dnf check-update",
+    "yum": "yum check-update",
+    "choco": "choco outdated",
+    "brew": "brew outdated"
+}
+
+# Files a package manager updates when its package lists or installed
+# packages change; update check results stay valid while these are unchanged
+PACKAGE_METADATA_PATHS = {
+    "apt": ["/var/lib/apt/lists", "/var/lib/dpkg/status"],
+    "apt-get": ["/var/lib/apt/lists", "/var/lib/dpkg/status"],
+    "dnf": ["/var/cache/dnf", "/var/lib/rpm"],
+    "yum": ["/var/cache/yum", "/var/lib/rpm"]
+}
+
 # Default installation paths
 DEFAULT_PATHS = {
     "linux": Path.home() / "esim-tools",
@@ -39,5 +59,9 @@ DEFAULT_PATHS = {
 CONFIG_FILE = "tools_config.json"
 USER_CONFIG_FILE = "user_config.json"
 
+# Cache directory and files
+CACHE_DIR = Path.home() / ".cache" / "esim-tool-manager"
+UPDATE_CHECK_CACHE_FILE = "update_checks.json"
+
 # Log file
 LOG_FILE = "esim_tool_manager.log"
\ No newline at end of file
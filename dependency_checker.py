@@ -3,36 +3,46 @@ Dependency checking for the eSim Tool Manager
 """
 import distro
 
+import functools
 import shutil
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Union
 
 from constants import SYSTEM, PACKAGE_MANAGERS
-from utils import is_tool_available, run_command
+from utils import is_tool_available, run_command, clear_tool_cache
 from logger import logger
 
+# The distribution can't change while we run, so read /etc/os-release once at import
+LINUX_DISTRO = distro.id() if SYSTEM == "linux" else ""
+
 def get_linux_distro() -> str:
     """Get Linux distribution ID using the 'distro' library."""
-    if SYSTEM != "linux":
-        return ""
-    return distro.id()
+    return LINUX_DISTRO
 
 class DependencyChecker:
     """Checks for and manages tool and system dependencies."""
 
-    def __init__(self):
-        self.system_dependencies = self.get_system_dependencies()
-        self.available_package_manager = self.get_package_manager()
+    @functools.cached_property
+    def system_dependencies(self) -> List[Union[str, List[str]]]:
+        """System-level dependencies, determined on first use."""
+        return self.get_system_dependencies()
     
-    def get_system_dependencies(self) -> List[str]:
+    @functools.cached_property
+    def available_package_manager(self) -> str:
+        """The system package manager, probed on first use."""
+        return self.get_package_manager()
+    
+    def get_system_dependencies(self) -> List[Union[str, List[str]]]:
         """
         Get system-level dependencies based on OS
+
+        A nested list is a group where any one of the tools is sufficient.
         """
         if SYSTEM == "linux":
-            return ["curl", "wget", "tar", "gzip"]
+            return [["curl", "wget"], "tar", "gzip"]
         elif SYSTEM == "windows":
             return ["powershell"]
         elif SYSTEM == "darwin":
-            return ["curl", "wget", "tar", "gzip"]
+            return [["curl", "wget"], "tar", "gzip"]
         return []
     
     def get_package_manager(self) -> str:
@@ -58,13 +68,10 @@ class DependencyChecker:
         """
         Check if system dependencies are available
         """
-        missing = []
-        for dep in self.system_dependencies:
-            if not is_tool_available(dep):
-                missing.append(dep)
+        missing = self.find_missing(self.system_dependencies)
         
         if missing:
-            logger.warning(f"Missing system dependencies: {', '.join(missing)}")
+            logger.warning("Missing system dependencies: %s", ', '.join(missing))
             return False, missing
         
         logger.info("All system dependencies are available")
@@ -75,19 +82,26 @@ class DependencyChecker:
         Check dependencies for a specific tool
         """
         dependencies = tool_config.get("dependencies", [])
-        missing = []
-        
-        for dep in dependencies:
-            if not is_tool_available(dep):
-                missing.append(dep)
+        missing = self.find_missing(dependencies)
         
         if missing:
-            logger.warning(f"Missing dependencies for tool: {', '.join(missing)}")
+            logger.warning("Missing dependencies for tool: %s", ', '.join(missing))
             return False, missing
         
         logger.info("All tool dependencies are available")
         return True, []
     
+    def find_missing(self, dependencies: List[Union[str, List[str]]]) -> List[str]:
+        """
+        Get the dependencies to install, picking the first tool of each unsatisfied any-of group
+        """
+        missing = []
+        for dep in dependencies:
+            group = dep if isinstance(dep, list) else [dep]
+            if group and not any(is_tool_available(name) for name in group):
+                missing.append(group[0])
+        return missing
+    
     def install_system_dependencies(self, dependencies: List[str]) -> bool:
         """
         Install system dependencies using the available package manager
@@ -96,17 +110,23 @@ class DependencyChecker:
             logger.error("No package manager available to install dependencies")
             return False
         
+        # Build argument lists so the command runs without a shell
         if SYSTEM == "windows" and self.available_package_manager == "choco":
-            command = f"choco install {' '.join(dependencies)} -y"
+            command = ["choco", "install", *dependencies, "-y"]
         elif SYSTEM == "darwin" and self.available_package_manager == "brew":
-            command = f"brew install {' '.join(dependencies)}"
+            command = ["brew", "install", *dependencies]
         elif SYSTEM == "linux" and self.available_package_manager:
             # Generic command for apt, dnf, yum etc.
-            command = f"sudo {self.available_package_manager} install -y {' '.join(dependencies)}"
+            command = ["sudo", self.available_package_manager, "install", "-y", *dependencies]
         else:
-            logger.error(f"Unsupported package manager: {self.available_package_manager}")
+            logger.error("Unsupported package manager: %s", self.available_package_manager)
             return False
         
-        logger.info(f"Installing dependencies: {', '.join(dependencies)}")
+        logger.info("Installing dependencies: %s", ', '.join(dependencies))
         result = run_command(command)
-        return result is not None
\ No newline at end of file
+        if result is None:
+            return False
+        
+        # Newly installed executables must be looked up again
+        clear_tool_cache()
+        return True
\ No newline at end of file
@@ -4,12 +4,12 @@ Tool installation functionality for the eSim Tool Manager
 
 import ctypes
 import os
-import platform
 import tempfile
 from pathlib import Path
 from typing import Dict, Any, Tuple, List
 
-from utils import run_command, create_directory, add_to_path
+from constants import SYSTEM
+from utils import run_command, create_directory, add_to_path, clear_tool_cache, is_tool_available
 from config_manager import ConfigManager
 from dependency_checker import DependencyChecker
 from logger import logger
@@ -20,41 +20,65 @@ class InstallManager:
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
         self.dependency_checker = DependencyChecker()
+        # Bumped whenever a tool is installed or uninstalled
+        self.install_generation = 0
     
     def install_tool(self, tool_name: str) -> Tuple[bool, str]:
         """Install a tool, checking for dependencies and admin rights."""
-        # On Windows, check for admin rights if choco is used, as it's often required.
-        if platform.system().lower() == "windows":
-            try:
-                is_admin = (os.getuid() == 0)
-            except AttributeError:
-                is_admin = ctypes.windll.shell32.IsUserAnAdmin() != 0
-            
-            if not is_admin and self.dependency_checker.available_package_manager == "choco":
-                return False, "Administrator privileges are required to install tools with Chocolatey. Please run the terminal as an administrator."
+        return self.install_tools([tool_name])[tool_name]
 
-        # Get tool configuration
-        tool_config = self.config_manager.get_tool_config(tool_name)
-        if not tool_config:
-            return False, f"Tool {tool_name} not found in configuration"
-        
-        # Check if already installed
-        if self.is_tool_installed(tool_name, tool_config):
-            return True, f"Tool {tool_name} is already installed"
-        
-        # Check dependencies
-        dep_success, missing_deps = self.dependency_checker.check_tool_dependencies(tool_config)
-        if not dep_success and missing_deps:
-            install_deps = self.prompt_install_dependencies(missing_deps)
-            if install_deps:
-                success = self.dependency_checker.install_system_dependencies(missing_deps)
-                if not success:
-                    return False, f"Failed to install dependencies: {', '.join(missing_deps)}"
+    def install_tools(self, tool_names: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Install several tools, installing their combined missing dependencies
+        with a single package manager invocation.
+        """
+        admin_error = self._check_admin_rights()
+        if admin_error:
+            return {tool_name: (False, admin_error) for tool_name in tool_names}
+
+        results = {}
+        pending = {}
+        all_missing = {}
+        for tool_name in tool_names:
+            tool_config = self.config_manager.get_tool_config(tool_name)
+            if not tool_config:
+                results[tool_name] = (False, f"Tool {tool_name} not found in configuration")
+                continue
+            
+            platform_config = self.config_manager.get_platform_config(tool_config)
+            if self.is_tool_installed(tool_name, tool_config, platform_config):
+                results[tool_name] = (True, f"Tool {tool_name} is already installed")
             else:
-                return False, f"Missing dependencies: {', '.join(missing_deps)}"
-        
-        # Get platform-specific configuration
-        platform_config = self.config_manager.get_platform_config(tool_config)
+                pending[tool_name] = platform_config
+                _, missing_deps = self.dependency_checker.check_tool_dependencies(tool_config)
+                # A dict keeps the dependencies unique while preserving their order
+                all_missing.update(dict.fromkeys(missing_deps))
+
+        if pending and all_missing:
+            missing_deps = list(all_missing)
+            failure = None
+            if self.prompt_install_dependencies(missing_deps):
+                if not self.dependency_checker.install_system_dependencies(missing_deps):
+                    failure = f"Failed to install dependencies: {', '.join(missing_deps)}"
+            else:
+                failure = f"Missing dependencies: {', '.join(missing_deps)}"
+            if failure:
+                for tool_name in pending:
+                    results[tool_name] = (False, failure)
+                pending = {}
+
+        # Write the user configuration once for the whole operation
+        with self.config_manager.deferred_save():
+            for tool_name, platform_config in pending.items():
+                results[tool_name] = self._run_install(tool_name, platform_config)
+
+        # Report in the order the tools were requested
+        return {tool_name: results[tool_name] for tool_name in tool_names}
+
+    def _run_install(self, tool_name: str, platform_config: Dict[str, Any]) -> Tuple[bool, str]:
+        """
+        Run the platform install command for a tool whose dependencies are satisfied.
+        """
         if not platform_config:
             return False, f"No installation instructions for {tool_name} on this platform"
         
@@ -68,22 +92,21 @@ class InstallManager:
         if not create_directory(install_path):
             return False, f"Failed to create installation directory: {install_path}"
         
-        # Set environment variables if needed
+        # Pass environment variables to the installer without touching our own environment
         env_vars = platform_config.get("environment", {})
-        original_env = os.environ.copy()
-        for key, value in env_vars.items():
-            os.environ[key] = value
+        child_env = {**os.environ, **env_vars} if env_vars else None
         
         # Execute installation command
-        logger.info(f"Installing {tool_name} with command: {install_cmd}")
-        result = run_command(install_cmd)
-        
-        # Restore original environment
-        os.environ.clear()
-        os.environ.update(original_env)
+        logger.info("Installing %s with command: %s", tool_name, install_cmd)
+        result = run_command(
+            self.config_manager.get_command_args(install_cmd, platform_config.get("shell", False)),
+            env=child_env
+        )
         
         if result is None:
             return False, f"Installation of {tool_name} failed"
+        clear_tool_cache()
+        self.install_generation += 1
         
         # Add to PATH if configured
         if platform_config.get("add_to_path", False):
@@ -91,6 +114,7 @@ class InstallManager:
         
         # Set environment variables in user config
         self._save_environment_variables(tool_name, env_vars)
+        self.config_manager.save_user_config()
         
         message = f"Successfully installed {tool_name}."
         if env_vars:
@@ -106,29 +130,40 @@ class InstallManager:
         if not tool_config:
             return False, f"Tool {tool_name} not found in configuration"
 
-        if not self.is_tool_installed(tool_name, tool_config):
+        platform_config = self.config_manager.get_platform_config(tool_config)
+        if not self.is_tool_installed(tool_name, tool_config, platform_config):
             return True, f"Tool {tool_name} is not installed."
 
-        platform_config = self.config_manager.get_platform_config(tool_config)
         uninstall_cmd = platform_config.get("uninstall")
 
         if not uninstall_cmd:
             return False, f"No uninstall command defined for {tool_name} on this platform."
 
-        logger.info(f"Uninstalling {tool_name} with command: {uninstall_cmd}")
-        result = run_command(uninstall_cmd)
+        logger.info("Uninstalling %s with command: %s", tool_name, uninstall_cmd)
+        result = run_command(self.config_manager.get_command_args(uninstall_cmd, platform_config.get("shell", False)))
 
         if result is None:
             return False, f"Uninstallation of {tool_name} failed."
+        clear_tool_cache()
+        self.install_generation += 1
 
         # Clean up environment variables from user config
         if "environment" in self.config_manager.user_config and tool_name in self.config_manager.user_config["environment"]:
             del self.config_manager.user_config["environment"][tool_name]
+            self.config_manager.mark_dirty()
             self.config_manager.save_user_config()
 
         return True, f"Successfully uninstalled {tool_name}."
+
+    def uninstall_tools(self, tool_names: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Uninstall several tools in sequence, writing the user configuration once.
+        """
+        with self.config_manager.deferred_save():
+            return {tool_name: self.uninstall_tool(tool_name) for tool_name in tool_names}
     
-    def is_tool_installed(self, tool_name: str, tool_config: Dict[str, Any] = None) -> bool:
+    def is_tool_installed(self, tool_name: str, tool_config: Dict[str, Any] = None,
+                          platform_config: Dict[str, Any] = None) -> bool:
         """
         Check if a tool is installed by checking its version or executable path.
         """
@@ -138,35 +173,53 @@ class InstallManager:
         if not tool_config:
             return False
         
-        platform_config = self.config_manager.get_platform_config(tool_config)
+        if platform_config is None:
+            platform_config = self.config_manager.get_platform_config(tool_config)
 
-        # Check using version command
-        # Prioritize platform-specific version check, then fall back to the general one.
-        version_cmd = platform_config.get("version_check", tool_config.get("version_check", ""))
-
-        if version_cmd:
-            result = run_command(version_cmd, capture_output=True, check=False, log_errors=False)
-            if result and result.returncode == 0:
-                return True
-        
         # Check if executable exists in installation directory
-        install_path = self.config_manager.install_path / tool_name
         exec_name = tool_config.get("executable", tool_name)
         
-        if platform.system().lower() == "windows":
+        if SYSTEM == "windows":
             exec_name += ".exe"
         
-        exec_path = install_path / "bin" / exec_name
-        if exec_path.exists():
+        if os.path.isfile(self.config_manager.tool_exec_path(tool_name, exec_name)):
             return True
         
         # Check if executable is in PATH
-        from utils import is_tool_available
         if is_tool_available(exec_name):
             return True
         
+        # Fall back to the version command only for tools whose executable
+        # can't be found by name (it spawns a subprocess).
+        # Prioritize platform-specific settings, then fall back to the general ones.
+        require_version_check = platform_config.get(
+            "require_version_check", tool_config.get("require_version_check", False)
+        )
+        version_cmd = platform_config.get("version_check", tool_config.get("version_check", ""))
+
+        if require_version_check and version_cmd:
+            result = run_command(version_cmd, capture_output=True, check=False, log_errors=False)
+            if result and result.returncode == 0:
+                return True
+        
         return False
     
+    def _check_admin_rights(self) -> str:
+        """
+        Return an error message if installing requires admin rights we don't have.
+        """
+        # On Windows, check for admin rights if choco is used, as it's often required.
+        if SYSTEM == "windows":
+            try:
+                is_admin = (os.getuid() == 0)
+            except AttributeError:
+                is_admin = ctypes.windll.shell32.IsUserAnAdmin() != 0
+            
+            if not is_admin and self.dependency_checker.available_package_manager == "choco":
+                return "Administrator privileges are required to install tools with Chocolatey. Please run the terminal as an administrator."
+        
+        return ""
+
     def prompt_install_dependencies(self, dependencies: List[str]) -> bool:
         """
         Prompt the user to install missing dependencies.
@@ -177,12 +230,12 @@ class InstallManager:
             return prompt_yes_no(message)
         except (ImportError, Exception) as e:
             # If UI is not available or another error occurs, log it and assume no.
-            logger.error(f"Could not prompt user for dependency installation: {e}")
+            logger.error("Could not prompt user for dependency installation: %s", e)
             return False
     
     def _save_environment_variables(self, tool_name: str, env_vars: Dict[str, str]):
         """
-        Save tool-specific environment variables to the user config file.
+        Record tool-specific environment variables in the user config.
         """
         if "environment" not in self.config_manager.user_config:
             self.config_manager.user_config["environment"] = {}
@@ -191,4 +244,4 @@ class InstallManager:
             self.config_manager.user_config["environment"][tool_name] = {}
         
         self.config_manager.user_config["environment"][tool_name].update(env_vars)
-        self.config_manager.save_user_config()
\ No newline at end of file
+        self.config_manager.mark_dirty()
\ No newline at end of file
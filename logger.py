@@ -3,12 +3,59 @@ Logging functionality for the eSim Tool Manager
 """
 
 import logging
+import logging.handlers
+import os
 import sys
 from datetime import datetime
 from pathlib import Path
 
 from constants import LOG_FILE
 
+class BatchedFileHandler(logging.handlers.BufferingHandler):
+    """
+    Buffer records and append them to a file with one write and one flush per
+    batch, flushing early on records at or above flush_level
+    """
+
+    def __init__(self, filename, capacity, flush_level=logging.ERROR, encoding=None):
+        super().__init__(capacity)
+        self.filename = os.path.abspath(filename)
+        self.flush_level = flush_level
+        self.encoding = encoding
+        # Opened on the first batch, so runs that log nothing create no file
+        self.stream = None
+
+    def shouldFlush(self, record):
+        return len(self.buffer) >= self.capacity or record.levelno >= self.flush_level
+
+    def flush(self):
+        self.acquire()
+        try:
+            records, self.buffer = self.buffer, []
+            if not records:
+                return
+            text = "".join(self.format(record) + "\n" for record in records)
+            try:
+                if self.stream is None:
+                    self.stream = open(self.filename, 'a', encoding=self.encoding)
+                self.stream.write(text)
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            # Writes out anything still buffered
+            super().close()
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+
 def setup_logger():
     """Set up logging configuration"""
     # Create logs directory if it doesn't exist
@@ -27,8 +74,9 @@ def setup_logger():
         '%(levelname)s: %(message)s'
     )
     
-    # File handler
-    file_handler = logging.FileHandler(LOG_FILE)
+    # File handler that writes records in batches; logging.shutdown flushes
+    # and closes it at exit
+    file_handler = BatchedFileHandler(LOG_FILE, capacity=256)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(file_formatter)
     
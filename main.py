@@ -3,27 +3,49 @@ Main entry point for the eSim Automated Tool Manager CLI.
 """
 
 import argparse
+import functools
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
 from logger import logger
 from config_manager import ConfigManager
 from install_manager import InstallManager
-from update_manager import UpdateManager
 
-def main():
-    """Main function to handle command-line arguments."""
-    # --- Setup ---
-    config_manager = ConfigManager()
-    install_manager = InstallManager(config_manager)
-    update_manager = UpdateManager(config_manager, install_manager)
+if TYPE_CHECKING:
+    from update_manager import UpdateManager
+
+class CommandContext:
+    """Managers shared by every command in a run, each constructed on first use."""
 
-    # --- Argument Parsing ---
+    def __init__(self):
+        self.config_manager = ConfigManager()
+
+    @functools.cached_property
+    def install_manager(self) -> InstallManager:
+        return InstallManager(self.config_manager)
+
+    @functools.cached_property
+    def update_manager(self) -> "UpdateManager":
+        # Imported here so commands that never check updates don't load asyncio
+        from update_manager import UpdateManager
+        return UpdateManager(self.config_manager, self.install_manager)
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser."""
     parser = argparse.ArgumentParser(
         description="eSim Automated Tool Manager. Manages installation, updates, and configuration of external tools."
     )
     subparsers = parser.add_subparsers(dest="command", help="Available commands", required=True)
 
     # 'install' command
-    parser_install = subparsers.add_parser("install", help="Install a tool.")
-    parser_install.add_argument("tool_name", help="The name of the tool to install (e.g., ngspice, kicad).")
+    parser_install = subparsers.add_parser("install", help="Install one or more tools.")
+    parser_install.add_argument(
+        "tool_names",
+        nargs="+",
+        metavar="tool_name",
+        help="The name of the tool to install (e.g., ngspice, kicad)."
+    )
 
     # 'update' command
     parser_update = subparsers.add_parser("update", help="Update a tool or check for updates.")
@@ -43,35 +65,83 @@ def main():
     parser_list = subparsers.add_parser("list", help="List all available and installed tools.")
 
     # 'uninstall' command
-    parser_uninstall = subparsers.add_parser("uninstall", help="Uninstall a tool.")
-    parser_uninstall.add_argument("tool_name", help="The name of the tool to uninstall.")
+    parser_uninstall = subparsers.add_parser("uninstall", help="Uninstall one or more tools.")
+    parser_uninstall.add_argument(
+        "tool_names",
+        nargs="+",
+        metavar="tool_name",
+        help="The name of the tool to uninstall."
+    )
 
     # 'set-path' command
     parser_path = subparsers.add_parser("set-path", help="Set the base installation directory for tools.")
     parser_path.add_argument("path", help="The new absolute path for tool installations.")
 
-    args = parser.parse_args()
+    # 'batch' command
+    parser_batch = subparsers.add_parser("batch", help="Run commands from a file, one per line.")
+    parser_batch.add_argument(
+        "file",
+        help="File of commands in the same syntax as the command line (e.g., 'install ngspice')."
+    )
+
+    return parser
+
+def run_batch(parser: argparse.ArgumentParser, context: CommandContext, batch_file: str):
+    """
+    Run every command in a batch file against one set of managers,
+    saving the user configuration once at the end.
+    """
+    try:
+        f = open(batch_file, 'r')
+    except OSError as e:
+        logger.error("Could not read batch file %s: %s", batch_file, e)
+        return
+
+    # Only opening the file is guarded; errors from the commands themselves propagate
+    with f, context.config_manager.deferred_save():
+        for line_number, line in enumerate(f, start=1):
+            try:
+                tokens = shlex.split(line, comments=True)
+                if not tokens:
+                    continue
+                args = parser.parse_args(tokens)
+            except (ValueError, SystemExit):
+                # Unbalanced quotes, or argparse has already printed the usage error
+                logger.error("Skipping invalid command on line %s of %s", line_number, batch_file)
+                continue
+            
+            if args.command == "batch":
+                logger.error("Nested batch command on line %s of %s is not supported", line_number, batch_file)
+                continue
+            
+            execute_command(args, context)
+
+def execute_command(args: argparse.Namespace, context: CommandContext):
+    """Run a single parsed command."""
+    config_manager = context.config_manager
 
-    # --- Command Execution ---
     if args.command == "install":
-        logger.info(f"Attempting to install '{args.tool_name}'...")
-        success, message = install_manager.install_tool(args.tool_name)
-        if success:
-            logger.info(message)
-        else:
-            logger.error(message)
+        install_manager = context.install_manager
+        logger.info("Attempting to install %s...", ', '.join(repr(name) for name in args.tool_names))
+        results = install_manager.install_tools(args.tool_names)
+        for tool, (success, message) in results.items():
+            if success:
+                logger.info(message)
+            else:
+                logger.error(message)
 
     elif args.command == "update":
+        update_manager = context.update_manager
         if args.all:
             logger.info("Updating all installed tools...")
             results = update_manager.update_all_tools()
             for tool, (success, message) in results.items():
                 if success:
-                    logger.info(f"'{tool}': {message}")
+                    logger.info("'%s': %s", tool, message)
                 else:
-                    logger.error(f"'{tool}': {message}")
+                    logger.error("'%s': %s", tool, message)
         elif args.tool_name:
-            logger.info(f"Attempting to update '{args.tool_name}'...")
+            logger.info("Attempting to update '%s'...", args.tool_name)
             success, message = update_manager.update_tool(args.tool_name)
             if success:
                 logger.info(message)
@@ -84,27 +154,46 @@ def main():
                 logger.info("All tools are up to date.")
             else:
                 for tool, status in updates.items():
-                    logger.info(f"- {tool}: {status}")
+                    logger.info("- %s: %s", tool, status)
 
     elif args.command == "list":
+        install_manager = context.install_manager
         logger.info("Available tools:")
         all_tools = config_manager.get_all_tools()
+        # Version checks spawn subprocesses, so probe every tool concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(16, len(all_tools)))) as executor:
+            installed = dict(zip(all_tools, executor.map(install_manager.is_tool_installed, all_tools, all_tools.values())))
         for tool_name, config in all_tools.items():
-            installed_status = " (installed)" if install_manager.is_tool_installed(tool_name, config) else ""
+            installed_status = " (installed)" if installed[tool_name] else ""
             description = config.get('description', 'No description')
-            logger.info(f"- {tool_name}{installed_status}: {description}")
+            logger.info("- %s%s: %s", tool_name, installed_status, description)
 
     elif args.command == "uninstall":
-        logger.info(f"Attempting to uninstall '{args.tool_name}'...")
-        success, message = install_manager.uninstall_tool(args.tool_name)
-        if success:
-            logger.info(message)
-        else:
-            logger.error(message)
+        install_manager = context.install_manager
+        logger.info("Attempting to uninstall %s...", ', '.join(repr(name) for name in args.tool_names))
+        results = install_manager.uninstall_tools(args.tool_names)
+        for tool, (success, message) in results.items():
+            if success:
+                logger.info(message)
+            else:
+                logger.error(message)
 
     elif args.command == "set-path":
-        logger.info(f"Setting new installation path to '{args.path}'...")
+        logger.info("Setting new installation path to '%s'...", args.path)
         config_manager.set_install_path(args.path)
 
+def main():
+    """Main function to handle command-line arguments."""
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Managers are only constructed when a command needs them
+    context = CommandContext()
+
+    if args.command == "batch":
+        run_batch(parser, context, args.file)
+    else:
+        execute_command(args, context)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -14,5 +14,9 @@ def prompt_yes_no(message: str) -> bool:
     Returns:
         Boolean indicating the user's choice.
     """
-    reply = str(input(f"{message} (y/n): ")).lower().strip()
-    return reply[:1] == 'y'
\ No newline at end of file
+    reply = input(f"{message} (y/n): ")
+    # Only the first non-blank character matters
+    for char in reply:
+        if not char.isspace():
+            return char in "yY"
+    return False
\ No newline at end of file
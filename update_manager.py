@@ -2,46 +2,104 @@
 Update checking and handling for the eSim Tool Manager
 """
 
-from typing import Dict, List, Tuple, Any
+import asyncio
+import atexit
+import functools
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, FrozenSet, Iterator, List, Optional, Tuple
 
+from constants import PACKAGE_METADATA_PATHS, UPDATE_CHECK_CACHE_FILE
 from config_manager import ConfigManager
 from install_manager import InstallManager
-from utils import run_command
+from utils import command_program, run_command_async, load_disk_cache, save_disk_cache
 from logger import logger
 
+@functools.lru_cache(maxsize=None)
+def _package_line_pattern(tool_name: str) -> "re.Pattern[bytes]":
+    """
+    Match a line of bulk update check output that starts with the package name,
+    followed by whitespace, '/', '|', '.' or the end of the line.
+    """
+    return re.compile(rb"^" + re.escape(tool_name.encode()) + rb"(?=[\s/|.]|$)", re.MULTILINE)
+
 class UpdateManager:
     """Manages checking for and applying updates to installed tools."""
 
     def __init__(self, config_manager: ConfigManager, install_manager: InstallManager):
         self.config_manager = config_manager
         self.install_manager = install_manager
+        # One lock per package manager; apt, dnf, etc. refuse to run concurrently
+        self._package_manager_locks = {}
+        # Event loop for asynchronous subprocesses, created on first use and reused
+        self._loop = None
+        # Tool and platform configs of the whole catalog, rebuilt when the catalog reloads
+        self._catalog = None
+        self._resolved_tools = {}
+        # Names of the installed tools, and the catalog and install generation they were probed for
+        self._installed = frozenset()
+        self._installed_key = None
+        # Update check outputs saved across runs, loaded on first use
+        self._update_check_cache = None
+        self._update_check_cache_dirty = False
     
     def check_updates(self) -> Dict[str, str]:
         """Check for available updates for all installed tools."""
-        updates = {}
-        tools = self.config_manager.get_all_tools()
-        
-        for tool_name, tool_config in tools.items():
-            if self.install_manager.is_tool_installed(tool_name, tool_config):
-                status = self._check_tool_update(tool_name, tool_config)
-                if status:
-                    updates[tool_name] = status
+        statuses = dict(self.iter_updates())
+        # Report in catalog order rather than the order the checks finished
+        return {tool_name: statuses[tool_name] for tool_name in self._get_resolved_tools() if tool_name in statuses}
+    
+    def iter_updates(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (tool name, status) for installed tools as their update checks finish.
+        Checks still running when the caller stops iterating are cancelled.
+        """
+        tools = self._get_resolved_tools()
+        installed = self._installed_snapshot()
         
-        return updates
+        # Start every update check command at once and report each as it completes
+        pending = self._start_update_checks(
+            {tool_name: platform_config for tool_name, (_, platform_config) in tools.items() if tool_name in installed}
+        )
+        try:
+            while pending:
+                done, _ = self._run_async(asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED))
+                for task in done:
+                    tool_name = pending.pop(task)
+                    status = task.result()
+                    if status:
+                        yield tool_name, status
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._run_async(asyncio.gather(*pending, return_exceptions=True))
+            
+            if self._update_check_cache_dirty:
+                save_disk_cache(UPDATE_CHECK_CACHE_FILE, self._update_check_cache)
+                self._update_check_cache_dirty = False
     
     def update_tool(self, tool_name: str) -> Tuple[bool, str]:
         """Update a single tool using its defined update command."""
+        return self._run_async(self._update_tool_async(tool_name))
+    
+    async def _update_tool_async(self, tool_name: str) -> Tuple[bool, str]:
+        """
+        Update a single tool without blocking other updates on the event loop.
+        """
         # Get tool configuration
         tool_config = self.config_manager.get_tool_config(tool_name)
         if not tool_config:
             return False, f"Tool {tool_name} not found in configuration"
         
+        # Get platform-specific configuration, memoized by the config manager
+        platform_config = self.config_manager.get_platform_config(tool_config)
+        
         # Check if tool is installed
-        if not self.install_manager.is_tool_installed(tool_name, tool_config):
+        if not self._is_installed(tool_name, tool_config, platform_config):
             return False, f"Tool {tool_name} is not installed"
         
-        # Get platform-specific configuration
-        platform_config = self.config_manager.get_platform_config(tool_config)
         if not platform_config:
             return False, f"No update instructions for {tool_name} on this platform"
         
@@ -50,43 +108,202 @@ class UpdateManager:
         if not update_cmd:
             return False, f"No update command defined for {tool_name}"
         
-        logger.info(f"Updating {tool_name} with command: {update_cmd}")
-        result = run_command(update_cmd)
+        logger.info("Updating %s with command: %s", tool_name, update_cmd)
+        async with self._package_manager_lock(update_cmd):
+            result = await run_command_async(
+                self.config_manager.get_command_args(update_cmd, platform_config.get("shell", False))
+            )
         
         if result is None:
             return False, f"Update of {tool_name} failed"
         
+        # An update may replace or move executables, so probe again next time
+        self._installed_key = None
         return True, f"Successfully updated {tool_name}"
     
     def update_all_tools(self) -> Dict[str, Tuple[bool, str]]:
         """
         Update all currently installed tools.
         """
-        results = {}
-        tools = self.config_manager.get_all_tools()
+        snapshot = self._installed_snapshot()
+        installed = [tool_name for tool_name in self._get_resolved_tools() if tool_name in snapshot]
         
-        for tool_name, tool_config in tools.items():
-            if self.install_manager.is_tool_installed(tool_name, tool_config):
-                success, message = self.update_tool(tool_name)
-                results[tool_name] = (success, message)
+        results = self._run_async(self._update_tools_async(installed))
+        return dict(zip(installed, results))
+    
+    async def _update_tools_async(self, tool_names: List[str]) -> List[Tuple[bool, str]]:
+        """
+        Update several tools concurrently, returning results in order.
+        Updates through different package managers run side by side.
+        """
+        return await asyncio.gather(*(self._update_tool_async(tool_name) for tool_name in tool_names))
+    
+    def _package_manager_lock(self, command: str) -> asyncio.Lock:
+        """
+        Get the lock serializing commands that use the same package manager.
+        Must be called from the event loop, which owns the locks.
+        """
+        package_manager = command_program(command)
+        if package_manager not in self._package_manager_locks:
+            self._package_manager_locks[package_manager] = asyncio.Lock()
+        return self._package_manager_locks[package_manager]
+    
+    def _get_resolved_tools(self) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Map every tool in the catalog to its (tool config, platform config) pair.
+        """
+        tools = self.config_manager.get_all_tools()
+        if tools is not self._catalog:
+            self._resolved_tools = {
+                tool_name: (tool_config, self.config_manager.get_platform_config(tool_config))
+                for tool_name, tool_config in tools.items()
+            }
+            self._catalog = tools
+        return self._resolved_tools
+    
+    def _installed_snapshot(self, force: bool = False) -> FrozenSet[str]:
+        """
+        Get the names of the installed tools, probing them only when forced, after
+        a tool was installed, uninstalled or updated, or when the catalog reloads.
+        """
+        tools = self._get_resolved_tools()
+        generation = self.install_manager.install_generation
+        if force or self._installed_key is None or self._installed_key[0] is not tools \
+                or self._installed_key[1] != generation:
+            self._installed = frozenset(self._find_installed(tools))
+            self._installed_key = (tools, generation)
+        return self._installed
+    
+    def _is_installed(self, tool_name: str, tool_config: Dict[str, Any], platform_config: Dict[str, Any]) -> bool:
+        """
+        Check whether a tool is installed, reading the installed-tools snapshot
+        if it is current and probing only this tool otherwise.
+        """
+        if self._installed_key is not None and self._installed_key[0] is self._resolved_tools \
+                and self._installed_key[1] == self.install_manager.install_generation:
+            return tool_name in self._installed
+        return self.install_manager.is_tool_installed(tool_name, tool_config, platform_config)
+    
+    def _find_installed(self, tools: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[str]:
+        """
+        Get the names of the installed tools, in catalog order.
+        """
+        # Probes stat files and may run version checks, so run them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(16, len(tools)))) as executor:
+            probes = executor.map(
+                self.install_manager.is_tool_installed,
+                tools,
+                [tool_config for tool_config, _ in tools.values()],
+                [platform_config for _, platform_config in tools.values()]
+            )
+            return [tool_name for tool_name, is_installed in zip(tools, probes) if is_installed]
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get this manager's event loop, creating it on first use.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            atexit.register(self._loop.close)
+        return self._loop
+    
+    def _run_async(self, coroutine):
+        """
+        Run a coroutine to completion on this manager's event loop.
+        """
+        return self._get_loop().run_until_complete(coroutine)
+    
+    def _start_update_checks(self, platform_configs: Dict[str, Dict[str, Any]]) -> Dict[asyncio.Task, str]:
+        """
+        Schedule update checks for several tools, mapping each task to its tool.
+        """
+        loop = self._get_loop()
+        # Tools of a package manager that can list all of its upgradable packages
+        # share one command instead of running one each
+        bulk_checks = {
+            tool_name: self.config_manager.get_bulk_update_check(platform_config.get("update_check", ""))
+            for tool_name, platform_config in platform_configs.items()
+        }
+        bulk_tasks = {
+            command: loop.create_task(self._run_update_check(command))
+            for command in dict.fromkeys(bulk_checks.values()) if command
+        }
         
-        return results
+        return {
+            loop.create_task(
+                self._check_tool_update_async(tool_name, platform_config, bulk_tasks.get(bulk_checks[tool_name]))
+            ): tool_name
+            for tool_name, platform_config in platform_configs.items()
+        }
     
-    def _check_tool_update(self, tool_name: str, tool_config: Dict[str, Any]) -> str:
+    async def _check_tool_update_async(self, tool_name: str, platform_config: Dict[str, Any],
+                                       bulk_check: Optional[Awaitable[Optional[bytes]]] = None) -> str:
         """
-        Check for updates for a specific tool using its update_check command.
+        Check for updates for a specific tool using its update_check command,
+        or the output of its package manager's bulk check if one was run.
         """
-        # Get platform-specific configuration
-        platform_config = self.config_manager.get_platform_config(tool_config)
         if not platform_config:
             return "Could not determine update status for this platform"
         
+        bulk_output = await bulk_check if bulk_check is not None else None
+        # Search the raw output rather than decoding all of it
+        if bulk_output is not None:
+            # Bulk output lists every upgradable package, so match whole names;
+            # a substring test would count kicad-library as kicad
+            return "Update available" if _package_line_pattern(tool_name).search(bulk_output) else "Up to date"
+        
+        tool_bytes = tool_name.encode()
+        
         # Check using update check command if available
         update_check_cmd = platform_config.get("update_check", "")
         if update_check_cmd:
-            result = run_command(update_check_cmd, capture_output=True, check=False)
-            if result and result.stdout and tool_name in result.stdout:
+            output = await self._run_update_check(update_check_cmd, platform_config.get("shell", False))
+            if output and tool_bytes in output:
                 return "Update available"
         
         return "Up to date"
+    
+    async def _run_update_check(self, command: str, use_shell: bool = False) -> Optional[bytes]:
+        """
+        Run an update check command and return its raw output, reusing the output
+        of an earlier run while the package manager's metadata is unchanged.
+        """
+        stamp = self._metadata_stamp(command)
+        if stamp is not None:
+            if self._update_check_cache is None:
+                self._update_check_cache = load_disk_cache(UPDATE_CHECK_CACHE_FILE)
+            entry = self._update_check_cache.get(command)
+            if isinstance(entry, dict) and entry.get("stamp") == stamp:
+                try:
+                    # Stored as latin-1 text, which maps every byte to one character
+                    return entry["stdout"].encode("latin-1")
+                except (KeyError, AttributeError, UnicodeEncodeError):
+                    pass
+        
+        result = await run_command_async(
+            self.config_manager.get_command_args(command, use_shell),
+            capture_output=True,
+            check=False,
+            text=False
+        )
+        if result is None:
+            return None
+        
+        if stamp is not None:
+            self._update_check_cache[command] = {"stamp": stamp, "stdout": result.stdout.decode("latin-1")}
+            self._update_check_cache_dirty = True
+        return result.stdout
+    
+    def _metadata_stamp(self, command: str) -> Optional[List[int]]:
+        """
+        Modification times of the package metadata a command reads, or None
+        if its results can't be cached.
+        """
+        paths = PACKAGE_METADATA_PATHS.get(command_program(command))
+        if not paths:
+            return None
+        try:
+            return [os.stat(path).st_mtime_ns for path in paths]
+        except OSError:
+            return None
         
\ No newline at end of file
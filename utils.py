@@ -2,62 +2,255 @@
 Utility functions for the eSim Tool Manager
 """
 
+import functools
+import json
 import os
+import shlex
 import shutil
+import signal
 import subprocess
-import sys
-from pathlib import Path
+import threading
 
-from constants import SYSTEM
+from constants import SYSTEM, CACHE_DIR
 from logger import logger
 
-def run_command(command, shell=True, check=True, capture_output=False, log_errors=True):
+# Separator between PATH entries
+_PATHSEP = os.pathsep
+
+# Entries of PATH as a set, and the PATH value the set was built from
+_path_entries = set()
+_path_entries_source = None
+
+def run_command(command, shell=None, check=True, capture_output=False, log_errors=True, env=None):
     """
     Run a system command and handle errors
+
+    The command may be a string, run through the shell, or an argument list,
+    executed directly. Pass shell explicitly to override this.
     """
+    if shell is None:
+        shell = isinstance(command, str)
+    if not isinstance(command, str):
+        command = list(command)
+    
     try:
+        if not shell and hasattr(os, "posix_spawnp"):
+            result = _spawn(command, capture_output, env)
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, command, result.stdout, result.stderr)
+            return result
+        
         result = subprocess.run(
             command, 
             shell=shell, 
             check=check, 
             capture_output=capture_output,
-            text=True
+            text=True,
+            env=env
         )
         return result
     except subprocess.CalledProcessError as e:
         if log_errors:
-            logger.error(f"Command failed: {command}")
-            logger.error(f"Error: {e}")
-            if e.stderr:
-                logger.error(f"Stderr: {e.stderr.strip()}")
+            _log_command_failure(e)
+        return None
+    except Exception as e:
+        if log_errors:
+            logger.error("Unexpected error executing command: %s", e)
         return None
+
+def _exit_code(status):
+    """
+    Convert a waitpid status to a return code, negative for a fatal signal,
+    as subprocess reports it (os.waitstatus_to_exitcode needs Python 3.9)
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+def _spawn(argv, capture_output=False, env=None):
+    """
+    Run an argument list with posix_spawnp, which avoids copying the
+    parent's memory mappings the way fork does
+
+    Unlike subprocess, descriptors explicitly made inheritable are not closed
+    in the child; descriptors Python opens are non-inheritable by default.
+    """
+    # Restore the signals Python ignores, as subprocess does
+    sigdef = [getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name)]
+    if not capture_output:
+        pid = os.posix_spawnp(argv[0], argv, os.environ if env is None else env, setsigdef=sigdef)
+        _, status = os.waitpid(pid, 0)
+        return subprocess.CompletedProcess(argv, _exit_code(status))
+    
+    # Pipes from os.pipe aren't inherited, so the child only keeps the duplicated ends
+    out_read, out_write = os.pipe()
+    err_read, err_write = os.pipe()
+    try:
+        pid = os.posix_spawnp(
+            argv[0], argv, os.environ if env is None else env,
+            file_actions=[(os.POSIX_SPAWN_DUP2, out_write, 1), (os.POSIX_SPAWN_DUP2, err_write, 2)],
+            setsigdef=sigdef
+        )
+    except OSError:
+        os.close(out_read)
+        os.close(err_read)
+        raise
+    finally:
+        os.close(out_write)
+        os.close(err_write)
+    
+    # Drain stderr on a thread so neither pipe can fill up and stall the child
+    stderr_chunks = []
+    with open(out_read, 'rb') as out, open(err_read, 'rb') as err:
+        reader = threading.Thread(target=lambda: stderr_chunks.append(err.read()), daemon=True)
+        reader.start()
+        stdout = out.read()
+        reader.join()
+    _, status = os.waitpid(pid, 0)
+    
+    return subprocess.CompletedProcess(
+        argv,
+        _exit_code(status),
+        stdout.decode(errors="replace"),
+        b"".join(stderr_chunks).decode(errors="replace")
+    )
+
+async def run_command_async(command, check=True, capture_output=False, log_errors=True, text=True):
+    """
+    Run a system command without blocking the event loop
+
+    Takes the same kind of command as run_command and handles errors the same way.
+    With text=False, captured output is returned as undecoded bytes.
+    """
+    # asyncio is imported on first use; most commands never need an event loop
+    import asyncio
+    
+    pipe = asyncio.subprocess.PIPE if capture_output else None
+    try:
+        if isinstance(command, str):
+            process = await asyncio.create_subprocess_shell(command, stdout=pipe, stderr=pipe)
+        else:
+            command = list(command)
+            process = await asyncio.create_subprocess_exec(*command, stdout=pipe, stderr=pipe)
+        stdout, stderr = await process.communicate()
     except Exception as e:
         if log_errors:
-            logger.error(f"Unexpected error executing command: {e}")
+            logger.error("Unexpected error executing command: %s", e)
+        return None
+    
+    if capture_output and text:
+        stdout = stdout.decode(errors="replace")
+        stderr = stderr.decode(errors="replace")
+    
+    if check and process.returncode != 0:
+        if log_errors:
+            _log_command_failure(subprocess.CalledProcessError(process.returncode, command, stdout, stderr))
         return None
+    
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+def _log_command_failure(error):
+    """
+    Log a command that exited with a non-zero status
+    """
+    command = error.cmd
+    logger.error("Command failed: %s", command if isinstance(command, str) else shlex.join(command))
+    logger.error("Error: %s", error)
+    if error.stderr:
+        stderr = error.stderr
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors="replace")
+        logger.error("Stderr: %s", stderr.strip())
+
+def command_program(command):
+    """
+    Get the name of the program a command runs, skipping a leading sudo
+    """
+    words = command.split() if isinstance(command, str) else list(command)
+    if words[:1] == ["sudo"]:
+        words = words[1:]
+    return words[0] if words else ""
 
 def is_tool_available(tool_name):
     """
     Check if a tool is available in the system PATH
     """
-    return shutil.which(tool_name) is not None
+    # Keying on PATH makes lookups after add_to_path miss the cache
+    return _which_cached(tool_name, os.environ.get("PATH"))
+
+@functools.lru_cache(maxsize=256)
+def _which_cached(tool_name, search_path):
+    """
+    Look up an executable in the given search path, remembering the answer
+    """
+    return shutil.which(tool_name, path=search_path) is not None
+
+def clear_tool_cache():
+    """
+    Forget cached PATH lookups so newly installed tools are re-probed
+    """
+    _which_cached.cache_clear()
 
 def add_to_path(path):
     """
     Add a directory to the system PATH environment variable
     """
-    path_str = str(path)
-    if path_str not in os.environ["PATH"]:
-        os.environ["PATH"] = path_str + os.pathsep + os.environ["PATH"]
-        logger.info(f"Added {path_str} to PATH (current session only)")
+    global _path_entries, _path_entries_source
+    
+    env = os.environ
+    path_str = path if isinstance(path, str) else str(path)
+    current_path = env.get("PATH", "")
+    # Rebuild the set if PATH was changed elsewhere
+    if current_path != _path_entries_source:
+        _path_entries = set(current_path.split(_PATHSEP))
+        _path_entries_source = current_path
+    
+    # Compare whole entries so /usr/bin doesn't count as already in /usr/bin2
+    if path_str not in _path_entries:
+        new_path = "".join((path_str, _PATHSEP, current_path)) if current_path else path_str
+        env["PATH"] = new_path
+        _path_entries.add(path_str)
+        _path_entries_source = new_path
+        logger.info("Added %s to PATH (current session only)", path_str)
+
+def load_disk_cache(name):
+    """
+    Load a JSON cache file from the cache directory, or an empty dict if it
+    is missing or unreadable
+    """
+    try:
+        with open(CACHE_DIR / name, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def save_disk_cache(name, data):
+    """
+    Write a JSON cache file to the cache directory
+    """
+    cache_path = CACHE_DIR / name
+    temp_path = cache_path.with_suffix(".tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, cache_path)
+        return True
+    except OSError as e:
+        logger.warning("Could not write cache file %s: %s", cache_path, e)
+        return False
 
 def create_directory(path):
     """
     Create a directory if it doesn't exist
     """
+    # A single stat is enough when reinstalling into an existing directory
+    if path.is_dir():
+        return True
     try:
         path.mkdir(parents=True, exist_ok=True)
         return True
     except Exception as e:
-        logger.error(f"Failed to create directory {path}: {e}")
+        logger.error("Failed to create directory %s: %s", path, e)
         return False
\ No newline at end of file